@@ -1,151 +1,291 @@
+from cachetools import TTLCache
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-import requests
-from bs4 import BeautifulSoup
+import httpx
+import lxml.html
+from lxml import etree
 import uvicorn
+import asyncio
+import os
+import sys
 import re
-import json
+import orjson
 
-app = FastAPI()
+# TripAdvisor blocks simple python scripts, so we must pretend to be a real Chrome browser
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.google.com/",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Encoding": "br, gzip"
+}
+
+# Patterns used while parsing, compiled once at import
+TEL_HREF_RE = re.compile(r"^tel:")
+BUBBLE_RATING_RE = re.compile(r"\d\.\d of 5 bubbles")
+DIGITS_RE = re.compile(r'([\d,]+)')
+READMORE_RE = re.compile(r'\s*Read more\s*')
+WHITESPACE_RE = re.compile(r'\s+')
+PHOTO_SIZE_RE = re.compile(r'/media/photo-[sflmt]/')
+PHOTO_ANY_SIZE_RE = re.compile(r'/media/photo-[a-z]/')
+# Charset declared in the page itself, checked in the first chunk of the body
+DECLARED_CHARSET_RE = re.compile(rb'(?:<meta[^>]+charset|<\?xml[^>]+encoding)\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+# A hotel photo URL that isn't a user avatar, icon, logo or map marker
+IMG_ACCEPT_RE = re.compile(r'^(?!.*(?:avatar|logo|icon|map_pin|\.svg|blank\.gif)).*media/photo-')
+
+# schema.org types TripAdvisor uses for the hotel entry in its JSON-LD
+LODGING_TYPES = {"Hotel", "LodgingBusiness", "Resort", "BedAndBreakfast", "Motel", "Hostel"}
+
+# One shared client so connections (and TLS sessions) are reused across requests.
+# Only idle connections are capped, concurrent fetches never wait for a free one
+client = httpx.AsyncClient(
+    http2=True,
+    timeout=10,
+    headers=DEFAULT_HEADERS,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=None, max_keepalive_connections=32),
+)
+
+# Hotel pages change slowly, so recently scraped results are reused for a few minutes
+scrape_cache = TTLCache(maxsize=1024, ttl=600)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await client.aclose()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 class HotelRequest(BaseModel):
     url: str
 
-@app.post("/scrape-hotel")
-def scrape_hotel(request: HotelRequest):
-    url = request.url
-    
-    # TripAdvisor blocks simple python scripts, so we must pretend to be a real Chrome browser
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Referer": "https://www.google.com/",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
-    }
+def new_parser(charset, head: bytes) -> lxml.html.HTMLParser:
+    # Incremental HTML parser for a streamed response body. Use the Content-Type charset,
+    # then the page's own <meta charset> / XML declaration, and UTF-8 (what TripAdvisor
+    # serves) when neither names an encoding lxml knows
+    declared = DECLARED_CHARSET_RE.search(head)
+    for encoding in (charset, declared and declared.group(1).decode("ascii"), "utf-8"):
+        if encoding:
+            try:
+                return lxml.html.HTMLParser(encoding=encoding)
+            except LookupError:
+                continue
 
+def close_parser(parser: lxml.html.HTMLParser) -> lxml.html.HtmlElement:
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail=f"Failed to fetch page. Status code: {response.status_code}")
-
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        # --- 1. Hotel Name (Cleaned) ---
-        hotel_name = "N/A"
-        h1_tag = soup.find("h1", {"id": "HEADING"})
-        
-        if h1_tag:
-            # CLEANUP: Remove the "Claimed" badge/tooltip logic BEFORE getting text
-            # Find and destroy the badge/tooltip element
-            junk_badge = h1_tag.find(attrs={"data-automation": "listingBadgeTooltip"})
-            if junk_badge:
-                junk_badge.decompose()  # This deletes the tag from the HTML tree completely
-            
-            # Also remove any standalone SVGs (icons) inside the H1
-            for icon in h1_tag.find_all("svg"):
-                icon.decompose()
-
-            # Now extract only the remaining text
-            hotel_name = h1_tag.get_text(strip=True)
-        
-        # --- 2. Hotel Description (Targeting About Tab first) ---
-        description = "N/A"
-        
-        # Priority 1: Look for the specific "About" tab container
-        about_tab = soup.find(attrs={"data-automation": "aboutTabDescription"})
-        if about_tab:
-            # Get text with separator to prevent words merging across divs
-            description = about_tab.get_text(separator=" ", strip=True)
-            # Remove common "Read more" link text if captured
-            description = description.replace("Read more", "").strip()
-        
-        # Priority 2: Fallback to Meta tag if the specific tab isn't found
-        if description == "N/A" or not description:
-            meta_desc = soup.find("meta", {"name": "description"}) or soup.find("meta", {"property": "og:description"})
-            if meta_desc:
-                description = meta_desc.get("content", "").strip()
-
-        # --- 3. Contact Number ---
-        contact_number = "N/A"
-        # Look for <a href="tel:+91...">
-        phone_link = soup.find("a", href=re.compile(r"^tel:"))
-        if phone_link:
-            contact_number = phone_link.get("href").replace("tel:", "")
-        else:
-            # Look for scripts containing phone numbers
-            script_content = soup.find(string=re.compile(r"telephone"))
-            if script_content:
-                # Try to regex extract a phone number pattern
-                phone_match = re.search(r'"telephone":"([^"]+)"', script_content)
-                if phone_match:
-                    contact_number = phone_match.group(1)
-
-        # --- 4. Rating ---
-        rating = "N/A"
+        return parser.close()
+    except etree.XMLSyntaxError:
+        # An empty body has no root element, treat it as an empty page so every field comes back "N/A"
+        return lxml.html.document_fromstring("<html></html>")
+
+def parse_page(chunks: list, charset) -> dict:
+    # Feed the body to lxml chunk by chunk, then pull the hotel fields out of the tree
+    parser = new_parser(charset, chunks[0] if chunks else b"")
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parse_hotel(close_parser(parser))
+
+def load_json_ld(tree: lxml.html.HtmlElement) -> list:
+    # Collect every object from the page's <script type="application/ld+json"> blocks
+    items = []
+    for script_text in tree.xpath('//script[@type="application/ld+json"]/text()', smart_strings=False):
+        try:
+            data = orjson.loads(script_text)
+        except orjson.JSONDecodeError:
+            continue
+        for item in data if isinstance(data, list) else [data]:
+            if isinstance(item, dict):
+                items.append(item)
+                graph = item.get("@graph")
+                if isinstance(graph, list):
+                    items.extend(x for x in graph if isinstance(x, dict))
+    return items
+
+def hotel_json_ld(items: list) -> dict:
+    # Pick the hotel's own entry out of the page's structured data
+    for item in items:
+        types = item.get("@type")
+        if any(isinstance(t, str) and t in LODGING_TYPES for t in (types if isinstance(types, list) else [types])):
+            return item
+    return {}
+
+def json_ld_text(value) -> str:
+    # Structured data values can be strings or numbers, missing ones become "N/A"
+    if value is None or isinstance(value, (dict, list)):
+        return "N/A"
+    return str(value).strip() or "N/A"
+
+def json_ld_images(value) -> list:
+    # "image" can be one URL, a list of URLs or a list of ImageObjects
+    images = []
+    for image in value if isinstance(value, list) else [value]:
+        src = image.get("url") if isinstance(image, dict) else image
+        if isinstance(src, str) and src:
+            images.append(src)
+    return images
+
+def add_image(images: list, seen_images: set, src) -> None:
+    # 1. Keep only hotel photos, filtering out user avatars, icons, and map markers
+    if not src or not IMG_ACCEPT_RE.search(src):
+        return
+
+    # 2. Logic to get High Res
+    # URLs look like: https://media-cdn.tripadvisor.com/media/photo-s/29/08/...jpg
+    # We try to force 'photo-w' (wide) for better quality
+    high_res_src = PHOTO_SIZE_RE.sub('/media/photo-w/', src)
+
+    # Clean URL (remove query parameters like ?w=50&h=50)
+    high_res_src = high_res_src.partition("?")[0]
+
+    # The same photo can show up in several sizes (e.g. photo-o and photo-w), keep the first one
+    photo_key = PHOTO_ANY_SIZE_RE.sub('/media/photo/', high_res_src)
+    if photo_key not in seen_images:
+        seen_images.add(photo_key)
+        images.append(high_res_src)
+
+def parse_hotel(tree: lxml.html.HtmlElement) -> dict:
+    # --- 0. Structured Data (JSON-LD) ---
+    # Most fields are available here without walking the page,
+    # the HTML lookups below only run for whatever is missing
+    json_ld = load_json_ld(tree)
+    hotel = hotel_json_ld(json_ld)
+    aggregate_rating = hotel.get("aggregateRating")
+    if not isinstance(aggregate_rating, dict):
+        aggregate_rating = {}
+
+    # --- 1. Hotel Name (Cleaned) ---
+    hotel_name = json_ld_text(hotel.get("name"))
+    h1_matches = tree.xpath('//h1[@id="HEADING"]') if hotel_name == "N/A" else []
+    
+    if h1_matches:
+        h1_tag = h1_matches[0]
+        # CLEANUP: Remove the "Claimed" badge/tooltip and any standalone SVGs (icons) BEFORE getting text
+        # One query finds both, so the H1 is only walked once
+        for junk in h1_tag.xpath('.//svg | .//*[@data-automation="listingBadgeTooltip"]'):
+            junk.drop_tree()  # This deletes the tag from the HTML tree but keeps the text after it
+
+        # Now extract only the remaining text
+        hotel_name = h1_tag.text_content().strip()
+    
+    # --- 2. Hotel Description (Targeting About Tab first) ---
+    description = json_ld_text(hotel.get("description"))
+    
+    # Priority 1: Look for the specific "About" tab container
+    about_tabs = tree.xpath('//*[@data-automation="aboutTabDescription"]') if description == "N/A" else []
+    if about_tabs:
+        # Join text nodes with a separator to prevent words merging across divs,
+        # then remove common "Read more" link text if captured and collapse the whitespace
+        description = " ".join(about_tabs[0].itertext())
+        description = WHITESPACE_RE.sub(" ", READMORE_RE.sub(" ", description)).strip()
+    
+    # Priority 2: Fallback to Meta tag if the specific tab isn't found
+    if description == "N/A" or not description:
+        meta_desc = tree.xpath('//meta[@name="description"]/@content') or tree.xpath('//meta[@property="og:description"]/@content')
+        if meta_desc:
+            description = meta_desc[0].strip()
+
+    # --- 3. Contact Number ---
+    contact_number = json_ld_text(hotel.get("telephone"))
+    if contact_number == "N/A":
+        # The page may describe the hotel under another type (e.g. LocalBusiness)
+        for item in json_ld:
+            if json_ld_text(item.get("telephone")) != "N/A":
+                contact_number = json_ld_text(item["telephone"])
+                break
+    # Look for <a href="tel:+91...">
+    phone_hrefs = tree.xpath('//a[starts-with(@href, "tel:")]/@href') if contact_number == "N/A" else []
+    if phone_hrefs:
+        contact_number = TEL_HREF_RE.sub("", phone_hrefs[0])
+
+    # --- 4. Rating ---
+    rating = json_ld_text(aggregate_rating.get("ratingValue"))
+    if rating == "N/A":
         # Look for the bubble rating usually found near the top
-        rating_tag = soup.find("span", {"class": "uwJeR"}) # Common class for the number like "5.0"
-        if not rating_tag:
-            # Fallback: Look for text pattern X.X of 5 bubbles
-            text_rating = soup.find(string=re.compile(r"\d\.\d of 5 bubbles"))
-            if text_rating:
-                rating = text_rating.split(" ")[0]
+        rating_tags = tree.xpath('//span[contains(concat(" ", normalize-space(@class), " "), " uwJeR ")]') # Common class for the number like "5.0"
+        if not rating_tags:
+            # Fallback: The bubble graphic is labelled "X.X of 5 bubbles",
+            # only scan the page text for that pattern if no label has it
+            for query in ('//*[contains(@aria-label, " of 5 bubbles")]/@aria-label', '//text()[contains(., " of 5 bubbles")]'):
+                for value in tree.xpath(query):
+                    bubble_match = BUBBLE_RATING_RE.search(value)
+                    if bubble_match:
+                        rating = bubble_match.group(0).split(" ")[0]
+                        break
+                if rating != "N/A":
+                    break
         else:
-            rating = rating_tag.text.strip()
-
-        # --- 5. Review Count (Targeted) ---
-        review_count = "N/A"
-        # Look for the element with the specific automation tag
-        review_tag = soup.find(attrs={"data-automation": "bubbleReviewCount"})
-
-        if review_tag:
-            # Text will look like "(833 reviews)"
-            text = review_tag.text.strip()
-            # Use Regex to extract only the numbers (handles commas like 1,000)
-            match = re.search(r'([\d,]+)', text)
-            if match:
-                review_count = match.group(1).replace(",", "") 
-
-        # --- 6. MAIN IMAGES (High Quality Only) ---
-        images = []
-        # Find all images
-        img_tags = soup.find_all("img")
-        
-        for img in img_tags:
-            # TripAdvisor often puts the real URL in data-lazyurl or data-src to prevent load lag
-            src = img.get("data-lazyurl") or img.get("data-src") or img.get("src")
-            
-            if src and "media/photo-" in src:
-                # 1. Filter out user avatars, icons, and map markers
-                if any(x in src for x in ["avatar", "logo", "icon", "map_pin", ".svg", "blank.gif"]):
-                    continue
-
-                # 2. Logic to get High Res
-                # URLs look like: https://media-cdn.tripadvisor.com/media/photo-s/29/08/...jpg
-                # We try to force 'photo-w' (wide) for better quality
-                high_res_src = re.sub(r'/media/photo-[sflmt]/', '/media/photo-w/', src)
-                
-                # Clean URL (remove query parameters like ?w=50&h=50)
-                if "?" in high_res_src:
-                    high_res_src = high_res_src.split("?")[0]
-
-                if high_res_src not in images:
-                    images.append(high_res_src)
-            
-            # 3. Stop after grabbing the main hero images (usually top 10)
-            if len(images) >= 10:
-                break
+            rating = rating_tags[0].text_content().strip()
+
+    # --- 5. Review Count (Targeted) ---
+    review_count = json_ld_text(aggregate_rating.get("reviewCount")).replace(",", "")
+    # Look for the element with the specific automation tag
+    review_tags = tree.xpath('//*[@data-automation="bubbleReviewCount"]') if review_count == "N/A" else []
+
+    if review_tags:
+        # Text will look like "(833 reviews)"
+        text = review_tags[0].text_content().strip()
+        # Use Regex to extract only the numbers (handles commas like 1,000)
+        match = DIGITS_RE.search(text)
+        if match:
+            review_count = match.group(1).replace(",", "") 
+
+    # --- 6. MAIN IMAGES (High Quality Only) ---
+    images = []
+    seen_images = set()
+    for src in json_ld_images(hotel.get("image")):
+        if len(images) >= 10:
+            break
+        add_image(images, seen_images, src)
+
+    # Top up from the page's <img> tags, walking them lazily so we stop reading the tree once we have enough
+    for img in tree.iter("img"):
+        # 3. Stop after grabbing the main hero images (usually top 10)
+        if len(images) >= 10:
+            break
+
+        # TripAdvisor often puts the real URL in data-lazyurl or data-src to prevent load lag
+        src = img.get("data-lazyurl") or img.get("data-src") or img.get("src")
+        add_image(images, seen_images, src)
+
+    return {
+        "hotel_name": hotel_name,
+        "hotel_description": description,
+        "contact_number": contact_number,
+        "hotel_review_rating": rating,
+        "total_review_count": review_count,
+        "images": images
+    }
+
+@app.post("/scrape-hotel")
+async def scrape_hotel(request: HotelRequest):
+    url = request.url
+
+    cached = scrape_cache.get(url)
+    if cached is not None:
+        return {
+            "status": "success",
+            "data": cached
+        }
+
+    try:
+        async with client.stream("GET", url) as response:
+            if response.status_code != 200:
+                raise HTTPException(status_code=400, detail=f"Failed to fetch page. Status code: {response.status_code}")
+
+            # Keep the decoded chunks as they arrive instead of joining them into one body
+            chunks = [chunk async for chunk in response.aiter_bytes()]
+
+        # Tree building and extraction are CPU-bound, so do them all in one hop off the event loop
+        data = await asyncio.to_thread(parse_page, chunks, response.charset_encoding)
+        # Don't keep pages nothing could be read from (e.g. a bot check served with 200)
+        if data["hotel_name"] != "N/A":
+            scrape_cache[url] = data
 
         return {
             "status": "success",
-            "data": {
-                "hotel_name": hotel_name,
-                "hotel_description": description,
-                "contact_number": contact_number,
-                "hotel_review_rating": rating,
-                "total_review_count": review_count,
-                "images": images
-            }
+            "data": data
         }
 
     except Exception as e:
@@ -153,4 +293,14 @@ def scrape_hotel(request: HotelRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # uvloop and httptools are the C event loop / HTTP parser, uvloop isn't available on Windows
+    # Workers import the app by name, so point uvicorn at this file wherever it's started from
+    uvicorn.run(
+        f"{os.path.splitext(os.path.basename(__file__))[0]}:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host="0.0.0.0",
+        port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=os.cpu_count(),
+    )